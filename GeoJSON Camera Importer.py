@@ -11,10 +11,65 @@ bl_info = {
 import bpy
 import json
 import os
-import math
+import numpy as np
 from bpy_extras.io_utils import ImportHelper
-from mathutils import Matrix, Vector
-from math import radians, tan
+from mathutils import Matrix
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+IMAGE_FOLDERS = {'drone', 'jpg', 'jpeg', 'img', 'image', 'images', 'photo', 'photos', 'dji', 'dcim'}
+
+
+def _scan(base, skip=()):
+    # Recursive os.scandir walk yielding each directory with its file entries,
+    # leaving out the directories in skip; DirEntry caches stat info so no
+    # extra syscalls are needed per file
+    files = []
+    subdirs = []
+    try:
+        with os.scandir(base) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.path not in skip:
+                        subdirs.append(entry.path)
+                else:
+                    files.append(entry)
+    except OSError:
+        # Skip unreadable directories, like os.walk does by default
+        return
+    
+    yield base, files
+    for subdir in subdirs:
+        yield from _scan(subdir, skip)
+
+
+def _in_image_folder(path):
+    # Exact folder names are a single set intersection; names that only contain
+    # one, such as my_images or DJI_202405011230_001, fall back to a substring test
+    parts = {part.lower() for part in path.split(os.sep)}
+    if parts & IMAGE_FOLDERS:
+        return True
+    return any(folder in part for part in parts for folder in IMAGE_FOLDERS)
+
+
+def _find_image_folders(base_path):
+    # Image folders sitting directly next to the shots file, e.g. ODM's images/
+    try:
+        with os.scandir(base_path) as it:
+            return [entry.path for entry in it
+                    if entry.is_dir(follow_symlinks=False) and entry.name.lower() in IMAGE_FOLDERS]
+    except OSError:
+        return []
 
 
 class ImportGeoJSONCameraOperator(bpy.types.Operator, ImportHelper):
@@ -75,14 +130,12 @@ class ImportGeoJSONCameraOperator(bpy.types.Operator, ImportHelper):
         # Print to console for debug purposes
         print(f"Created text object with offset: {offset_text}")
 
-    def calculate_translation_offset(self, features):
+    def calculate_translation_offset(self, translations):
         # Only calculate the mean midpoint if the user enabled it
         if self.use_mean_midpoint:
             print("Calculating mean midpoint for offset...")
-            translations = [feature['properties']['translation'] for feature in features]
-            
-            avg_x = sum(t[0] for t in translations) / len(translations)
-            avg_y = sum(t[1] for t in translations) / len(translations)
+            avg = translations[:, :2].mean(axis=0)
+            avg_x, avg_y = float(avg[0]), float(avg[1])
 
             self.translation_offset_x = avg_x
             self.translation_offset_y = avg_y
@@ -96,80 +149,132 @@ class ImportGeoJSONCameraOperator(bpy.types.Operator, ImportHelper):
             self.translation_offset_y == 0.0):
             # If no offset applied, do not create the text object
             print("No offset applied, skipping text object creation.")
-            return
         else:
             # Create the text object with the offset values
             self.create_offset_text_object()
 
-    def get_matrix(self, translation, rotation, scale=1.0):
-        axis = Vector((-rotation[0], -rotation[1], -rotation[2]))
-        angle = axis.length
+    def get_matrices(self, translations, rotations, offset):
+        # Build all camera matrices at once from (N, 3) translation and
+        # axis-angle rotation arrays using Rodrigues' rotation formula
+        translations = np.asarray(translations, dtype=np.float64).reshape(-1, 3)
+        rotations = np.asarray(rotations, dtype=np.float64).reshape(-1, 3)
+        count = len(rotations)
         
-        if angle > 0:
-            axis.normalize()
-            rotation_matrix = Matrix.Rotation(angle, 4, axis)
-        else:
-            rotation_matrix = Matrix.Identity(4)
+        angles = np.linalg.norm(rotations, axis=1)
+        safe_angles = np.where(angles > 0, angles, 1.0)
+        axes = -rotations / safe_angles[:, None]
         
-        adjusted_translation = [
-            translation[0] - self.translation_offset_x,
-            translation[1] - self.translation_offset_y,
-            translation[2] - self.translation_offset_z
-        ]
+        # Cross-product matrices of the rotation axes; zero rotations give K = 0
+        K = np.zeros((count, 3, 3))
+        K[:, 0, 1] = -axes[:, 2]
+        K[:, 0, 2] = axes[:, 1]
+        K[:, 1, 0] = axes[:, 2]
+        K[:, 1, 2] = -axes[:, 0]
+        K[:, 2, 0] = -axes[:, 1]
+        K[:, 2, 1] = axes[:, 0]
         
-        translation_matrix = Matrix.Translation(Vector(adjusted_translation))
+        R = (np.eye(3)
+             + np.sin(angles)[:, None, None] * K
+             + (1.0 - np.cos(angles))[:, None, None] * (K @ K))
         
-        if scale != 1.0:
-            scale_matrix = Matrix.Scale(scale, 4)
-            rotation_matrix = scale_matrix @ rotation_matrix
+        # Right-multiplying by the 180 degree X rotation diag(1, -1, -1)
+        # negates the Y and Z columns
+        R[:, :, 1:] *= -1.0
         
-        correction_matrix = Matrix.Rotation(radians(180), 4, 'X')
-        final_matrix = translation_matrix @ rotation_matrix @ correction_matrix
+        matrices = np.zeros((count, 4, 4))
+        matrices[:, :3, :3] = R
+        matrices[:, :3, 3] = translations - offset
+        matrices[:, 3, 3] = 1.0
         
-        return final_matrix
+        return matrices
 
-    def find_corresponding_images(self, base_path, camera_name):
-        image_extensions = {'.jpg', '.jpeg', '.png'}
-        matching_images = []
-        image_folders = {'drone', 'jpg', 'jpeg', 'img', 'image', 'images', 'photo', 'photos', 'dji', 'dcim'}
+    def _build_image_index(self, base_path):
+        # Map lowercased image basenames and, separately, their stems to paths,
+        # so the stem of one file can never shadow another file's full name
+        names = {}
+        stems = {}
+        image_folders = []
         
-        for root, dirs, files in os.walk(base_path):
-            normalized_root = os.path.normpath(root)
-            
-            if any(folder in normalized_root.lower() for folder in image_folders):
-                for file in files:
-                    if file.lower().endswith(tuple(image_extensions)) and camera_name in file:
-                        image_path = os.path.join(normalized_root, file)
-                        matching_images.append(image_path)
+        # In the common layout the images live in a folder next to the shots
+        # file, so only those folders are walked instead of the whole tree
+        if os.path.basename(base_path).lower() not in IMAGE_FOLDERS:
+            image_folders = _find_image_folders(base_path)
+            for image_folder in image_folders:
+                self._index_images(image_folder, names, stems)
+            if names:
+                return names, stems
         
-        return matching_images
+        # Otherwise walk the whole tree, minus the folders already searched
+        self._index_images(base_path, names, stems, skip=set(image_folders))
+        return names, stems
+
+    def _index_images(self, base_path, names, stems, skip=()):
+        for root, files in _scan(base_path, skip):
+            # Skip the whole directory unless it sits in an image folder
+            if not _in_image_folder(root):
+                continue
+            
+            for entry in files:
+                name = entry.name.lower()
+                if name.endswith(IMAGE_EXTENSIONS):
+                    names.setdefault(name, []).append(entry.path)
+                    stems.setdefault(os.path.splitext(name)[0], []).append(entry.path)
 
-    def set_camera_background_image(self, camera, image_path):
-        img = bpy.data.images.load(os.path.normpath(image_path))
+    def _lookup_images(self, image_index, camera_name):
+        names, stems = image_index
         
-        if img:
-            camera.data.show_background_images = True
-            bg = camera.data.background_images.new()
-            bg.image = img
-            bg.display_depth = 'BACK'
+        # Exact name matches first, then stems; both are plain dict lookups
+        camera_name = camera_name.lower()
+        images = names.get(camera_name) or stems.get(os.path.splitext(camera_name)[0])
+        if images:
+            return images
         
-        return img
+        # Fall back to a substring match against the indexed file names
+        matching_images = []
+        for name, paths in names.items():
+            if camera_name in name:
+                for path in paths:
+                    if path not in matching_images:
+                        matching_images.append(path)
+        
+        return matching_images
 
-    def set_scene_resolution(self, image):
-        width = image.size[0]
-        height = image.size[1]
+    def set_camera_background_image(self, camera, img):
+        camera.data.show_background_images = True
+        bg = camera.data.background_images.new()
+        bg.image = img
+        bg.display_depth = 'BACK'
+
+    def set_scene_resolution(self, size):
+        width = size[0]
+        height = size[1]
         bpy.context.scene.render.resolution_x = width
         bpy.context.scene.render.resolution_y = height
 
-    def create_camera_from_feature(self, feature, sensor_width, collection, base_path):
+    def load_background_images(self, pending_images):
+        loaded_images = {}
+        
+        # Only the first image sets the render resolution
+        if pending_images:
+            image_path = pending_images[0][1]
+            img = loaded_images[image_path] = bpy.data.images.load(image_path, check_existing=True)
+            self.set_scene_resolution(img.size)
+        
+        # Blender datablocks can only be created on the main thread
+        for cam_object, image_path in pending_images:
+            # Load each unique file once and share the datablock between cameras
+            img = loaded_images.get(image_path)
+            if img is None:
+                img = bpy.data.images.load(image_path, check_existing=True)
+                loaded_images[image_path] = img
+            
+            self.set_camera_background_image(cam_object, img)
+
+    def create_camera_from_feature(self, feature, sensor_width, collection, image_index, seen_images):
         properties = feature['properties']
         filename = properties['filename']
-        translation = properties['translation']
-        rotation = properties['rotation']
         focal = properties['focal']
         
-        fov = 2 * math.degrees(math.atan(sensor_width / (2 * (sensor_width * focal))))  # Not used but useful to keep
-        
         focal_length = sensor_width * focal
         
         cam_data = bpy.data.cameras.new(name=filename)
@@ -177,45 +282,115 @@ class ImportGeoJSONCameraOperator(bpy.types.Operator, ImportHelper):
         cam_data.sensor_width = sensor_width
         cam_object = bpy.data.objects.new(name=filename, object_data=cam_data)
         
-        bpy.context.collection.objects.link(cam_object)
+        # Objects from bpy.data.objects.new are not linked anywhere yet, so a
+        # single link into the import collection is all that is needed
         collection.objects.link(cam_object)
-        bpy.context.collection.objects.unlink(cam_object)
         
-        transform_matrix = self.get_matrix(translation, rotation)
-        cam_object.matrix_world = transform_matrix
-        images = self.find_corresponding_images(base_path, filename)
+        # Shots can repeat a filename, so each name is only looked up once
+        images = seen_images.get(filename)
+        if images is None:
+            images = seen_images[filename] = self._lookup_images(image_index, filename)
         
+        image_path = None
         if images:
             image_path = images[0]
             print(f"Found image for camera {filename}: {image_path}")
-            img = self.set_camera_background_image(cam_object, image_path)
-            self.set_scene_resolution(img)
         else:
             print(f"No images found for camera {filename}.")
+        
+        return cam_object, image_path
+
+    def remove_cameras(self, cameras, collection):
+        # Undo a failed import: drop the created objects, their camera data
+        # and the import collection so nothing is left behind in bpy.data
+        for cam_object in cameras:
+            cam_data = cam_object.data
+            bpy.data.objects.remove(cam_object)
+            bpy.data.cameras.remove(cam_data)
+        bpy.data.collections.remove(collection)
+
+    def iter_features(self, file_path):
+        # Stream features one at a time when ijson is available so large
+        # shot files never have to be held in memory as a whole
+        if ijson is not None:
+            with open(file_path, 'rb') as f:
+                yield from ijson.items(f, 'features.item', use_float=True)
+        else:
+            with open(file_path, 'rb') as f:
+                data = _loads(f.read())
+            yield from data.get('features', [])
 
     def execute(self, context):
         file_path = os.path.abspath(self.filepath)
         base_path = os.path.dirname(file_path)
+        sensor_width = float(self.sensor_width)
         
+        # The collection is only linked to the scene once the import succeeded;
+        # a failed import removes everything it created
+        camera_collection = bpy.data.collections.new(name="Imported Cameras")
+        image_index = None
+        seen_images = {}
+        pending_images = []
+        cameras = []
+        translations = []
+        rotations = []
+        
+        # Single pass over the features; transforms and the offset are
+        # computed afterwards from the collected translations and rotations
         try:
-            with open(file_path, 'r') as f:
-                data = json.load(f)
+            for feature in self.iter_features(file_path):
+                # The image tree is only walked once the file has yielded a feature
+                if image_index is None:
+                    image_index = self._build_image_index(base_path)
+                
+                translation = feature['properties']['translation']
+                rotation = feature['properties']['rotation']
+                cam_object, image_path = self.create_camera_from_feature(
+                    feature, sensor_width, camera_collection, image_index, seen_images)
+                cameras.append(cam_object)
+                translations.append(translation)
+                rotations.append(rotation)
+                # Background images are attached in one batch after all cameras exist
+                if image_path:
+                    pending_images.append((cam_object, image_path))
         except Exception as e:
+            self.remove_cameras(cameras, camera_collection)
             self.report({'ERROR'}, f"Failed to read the file: {str(e)}")
             return {'CANCELLED'}
         
-        features = data.get('features', [])
-        
-        if not features:
+        if not cameras:
+            self.remove_cameras(cameras, camera_collection)
             self.report({'ERROR'}, "No 'features' key found in the JSON file.")
             return {'CANCELLED'}
         
-        camera_collection = bpy.data.collections.new(name="Imported Cameras")
+        # Every camera needs a 3D translation and axis-angle rotation
+        try:
+            translations = np.asarray(translations, dtype=np.float64)
+            rotations = np.asarray(rotations, dtype=np.float64)
+            if translations.shape != (len(cameras), 3) or rotations.shape != (len(cameras), 3):
+                raise ValueError("every feature needs a 3-element translation and rotation")
+        except (TypeError, ValueError) as e:
+            self.remove_cameras(cameras, camera_collection)
+            self.report({'ERROR'}, f"Invalid camera data in the file: {str(e)}")
+            return {'CANCELLED'}
+        
         bpy.context.scene.collection.children.link(camera_collection)
-        self.calculate_translation_offset(features)  # Calculate the offset here
         
-        for feature in features:
-            self.create_camera_from_feature(feature, self.sensor_width, camera_collection, base_path)
+        self.calculate_translation_offset(translations)  # Calculate the offset here
+        
+        # Read the offset from the operator properties once for all cameras
+        offset = np.array((
+            float(self.translation_offset_x),
+            float(self.translation_offset_y),
+            float(self.translation_offset_z),
+        ))
+        
+        # Transforms are computed and assigned in one batch once every camera exists
+        matrices = self.get_matrices(translations, rotations, offset)
+        for cam_object, transform_matrix in zip(cameras, matrices):
+            cam_object.matrix_world = Matrix(transform_matrix.tolist())
+        
+        self.load_background_images(pending_images)
         
         return {'FINISHED'}
 